@@ -0,0 +1,42 @@
+"""Measure the delay from triggering a sound to its first sample leaving the
+sound card.
+
+Run with `poetry run python benchmarks/audio_latency_benchmark.py`.
+"""
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+from ai_image_frame.services import audio_service  # noqa: E402
+
+NUM_REPETITIONS = 20
+SOUND_NAME = "beep"
+# Triggers are spread out so that they hit different positions of the
+# output buffer
+TRIGGER_INTERVAL = 0.137
+
+
+def main() -> None:
+    engine = audio_service.init_audio()
+    voice = None
+    for _ in range(NUM_REPETITIONS):
+        voice = audio_service.play_sound(SOUND_NAME, replace=voice)
+        time.sleep(TRIGGER_INTERVAL)
+    assert voice is not None
+    voice.stop()
+    time.sleep(TRIGGER_INTERVAL)
+    engine.stop_output()
+
+    latencies_ms = [latency * 1000 for latency in engine.latencies]
+    print(
+        f"{len(latencies_ms)} triggers: "
+        f"mean {statistics.mean(latencies_ms):.1f} ms, "
+        f"min {min(latencies_ms):.1f} ms, "
+        f"max {max(latencies_ms):.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
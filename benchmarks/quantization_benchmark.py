@@ -0,0 +1,72 @@
+"""Compare quantization to the Inky palette with the conversion of the inky
+library.
+
+Run with `poetry run python benchmarks/quantization_benchmark.py [image_path]`.
+Without an image path, a noise image is used.
+"""
+import sys
+import timeit
+from typing import Callable
+
+from dotenv import load_dotenv
+from PIL import Image
+
+load_dotenv()
+from ai_image_frame.services import quantization_service  # noqa: E402
+
+NUM_REPETITIONS = 5
+SATURATION = 0.5
+# Inky portrait dimensions
+IMAGE_SIZE = (448, 600)
+
+
+def quantize_like_inky(image: Image.Image, saturation: float) -> Image.Image:
+    """Quantize the image the same way as `Inky.set_image` does.
+
+    The inky library can only be installed on the Pi, so its conversion is
+    replicated here.
+    """
+    palette = [
+        value
+        for colour in quantization_service.get_palette(saturation)
+        for value in colour
+    ]
+    palette_image = Image.new("P", (1, 1))
+    palette_image.putpalette(palette + [255, 255, 255] + [0, 0, 0] * 248)
+    return image.quantize(palette=palette_image, dither=Image.Dither.FLOYDSTEINBERG)
+
+
+def benchmark(name: str, function: Callable[[], object]) -> None:
+    duration = timeit.timeit(function, number=NUM_REPETITIONS)
+    print(f"{name}: {duration / NUM_REPETITIONS * 1000:.1f} ms")
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        image = Image.open(sys.argv[1]).convert("RGB").resize(IMAGE_SIZE)
+    else:
+        image = Image.effect_noise(IMAGE_SIZE, 64).convert("RGB")
+
+    # The lookup table is built once per saturation and cached, the following
+    # benchmarks only measure the lookups
+    quantization_service.get_palette_lut.cache_clear()
+    lut_duration = timeit.timeit(
+        lambda: quantization_service.get_palette_lut(SATURATION), number=1
+    )
+    print(f"lookup table construction: {lut_duration * 1000:.1f} ms")
+    benchmark("inky library", lambda: quantize_like_inky(image, SATURATION))
+    for dither in quantization_service.Dither:
+        benchmark(
+            f"quantization service, {dither.value}",
+            lambda: quantization_service.quantize_image(image, SATURATION, dither),
+        )
+    # Display images that are quantized ahead of time are only checked
+    quantized_image = quantization_service.quantize_image(image, SATURATION)
+    benchmark(
+        "quantized ahead of time",
+        lambda: quantization_service.is_quantized(quantized_image, SATURATION),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Compare text box rendering with the glyph atlas against rendering with PIL.
+
+Three versions are compared:
+- uncached: the original implementation, which loads the font for every fit
+  iteration and loads and resizes the label image for every text box
+- PIL: layout and drawing with PIL, using the cached fonts and label images
+- glyph atlas: text composited from cached glyphs
+
+Run with `poetry run python benchmarks/text_box_benchmark.py`.
+"""
+import textwrap
+import timeit
+from pathlib import Path
+from typing import Callable
+
+from dotenv import load_dotenv
+from PIL import Image, ImageDraw, ImageFont
+
+load_dotenv()
+from ai_image_frame.services import image_manipulation_service  # noqa: E402
+from ai_image_frame.services.common import get_absolute_asset_path  # noqa: E402
+
+NUM_REPETITIONS = 20
+# Label box sizes of a collage image and of a single display image
+COLLAGE_LABEL_DIMENSIONS = image_manipulation_service.Dimensions(width=224, height=76)
+DISPLAY_LABEL_DIMENSIONS = image_manipulation_service.Dimensions(width=448, height=152)
+CASES = [
+    ("button labels", ["1", "2", "3", "4"], COLLAGE_LABEL_DIMENSIONS, (0, 4)),
+    (
+        "prompt caption",
+        ["a lighthouse on a cliff during a thunderstorm, with waves crashing"],
+        DISPLAY_LABEL_DIMENSIONS,
+        (0, 0),
+    ),
+]
+
+
+def generate_text_box_uncached(
+    text: str,
+    output_dimensions: image_manipulation_service.Dimensions,
+    text_shift: tuple[int, int],
+    font_size: int = 32,
+    text_padding: tuple[int, int] = (10, 10),
+    label_padding: int = 20,
+) -> Image.Image:
+    """Create a text box the same way as `generate_text_box` did before fonts
+    and label images were cached.
+    """
+    text_box_image = Image.new(
+        "RGB", output_dimensions.as_tuple(), image_manipulation_service.SOLID_BLACK
+    )
+    label_image = Image.open(get_absolute_asset_path(Path("images") / "label.png"))
+    label_scale = text_box_image.width / label_image.width
+    label_image = label_image.resize(
+        (
+            round(label_image.width * label_scale),
+            round(label_image.height * label_scale),
+        )
+    )
+    label_image = image_manipulation_service.pad_image(
+        label_image, round(label_padding * label_scale)
+    )
+    text_box_image.paste(label_image, (0, 0), label_image)
+
+    font_path = str(get_absolute_asset_path(Path("fonts") / "Silent Reaction.ttf"))
+    xy = (
+        output_dimensions.width / 2 + text_shift[0],
+        output_dimensions.height / 2 + text_shift[1],
+    )
+    allowed_empty_y_fraction = 0.6
+    image_boundary_box = text_box_image.getbbox()
+    original_font_size = font_size
+    max_line_length = len(text)
+    draw = ImageDraw.Draw(text_box_image)
+
+    while True:
+        font = ImageFont.truetype(font_path, size=font_size)
+        wrapped_text = "\n".join(textwrap.wrap(text, width=max_line_length))
+        text_bounding_box = draw.textbbox(
+            xy, wrapped_text, anchor="mm", align="center", font=font
+        )
+        if (
+            text_bounding_box[0] < image_boundary_box[0] + text_padding[0]
+            or text_bounding_box[2] > image_boundary_box[2] - text_padding[0]
+            or text_bounding_box[1] < image_boundary_box[1] + text_padding[1]
+            or text_bounding_box[3] > image_boundary_box[3] - text_padding[1]
+        ):
+            if (text_bounding_box[3] - text_bounding_box[1]) / (
+                image_boundary_box[3] - image_boundary_box[1]
+            ) < allowed_empty_y_fraction and max_line_length > 1:
+                max_line_length -= 1
+                font_size = original_font_size
+            else:
+                font_size -= 1
+        else:
+            break
+
+    draw.text(
+        xy,
+        wrapped_text,
+        anchor="mm",
+        align="center",
+        fill=image_manipulation_service.SOLID_BLACK,
+        font=ImageFont.truetype(font_path, size=font_size),
+    )
+    return text_box_image
+
+
+def benchmark_text_box(
+    texts: list[str], generate_text_box: Callable[[str], Image.Image]
+) -> float:
+    """Return the average time in seconds to generate a text box."""
+    # Warm up font and glyph caches so that only the steady state is measured
+    for text in texts:
+        generate_text_box(text)
+    duration = timeit.timeit(
+        lambda: [generate_text_box(text) for text in texts], number=NUM_REPETITIONS
+    )
+    return duration / (NUM_REPETITIONS * len(texts))
+
+
+def main() -> None:
+    for name, texts, output_dimensions, text_shift in CASES:
+        uncached_duration = benchmark_text_box(
+            texts,
+            lambda text: generate_text_box_uncached(
+                text, output_dimensions, text_shift
+            ),
+        )
+        pil_duration = benchmark_text_box(
+            texts,
+            lambda text: image_manipulation_service.generate_text_box(
+                text, output_dimensions, text_shift=text_shift, use_glyph_atlas=False
+            ),
+        )
+        atlas_duration = benchmark_text_box(
+            texts,
+            lambda text: image_manipulation_service.generate_text_box(
+                text, output_dimensions, text_shift=text_shift, use_glyph_atlas=True
+            ),
+        )
+        print(
+            f"{name}: uncached {uncached_duration * 1000:.2f} ms, "
+            f"PIL {pil_duration * 1000:.2f} ms, "
+            f"glyph atlas {atlas_duration * 1000:.2f} ms "
+            f"({uncached_duration / atlas_duration:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
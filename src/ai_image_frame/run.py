@@ -1,8 +1,10 @@
+import argparse
 import os
+import threading
 from distutils.util import strtobool
 from pathlib import Path
+from typing import Optional
 
-import simpleaudio as sa
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,6 +16,8 @@ from ai_image_frame.services import (
     image_manipulation_service,
     inky_service,
     logging_service,
+    quantization_service,
+    slideshow_service,
     voice_service,
 )
 from ai_image_frame.services.common import get_absolute_asset_path
@@ -22,6 +26,9 @@ API_KEY = os.environ["OPENAI_API_KEY"]
 RUN_MODE = os.environ["RUN_MODE"]
 LOG_DIR = Path(os.environ["LOG_DIR"])
 IMAGE_DIR = Path(os.environ["IMAGE_DIR"])
+# Seconds between two images of the idle slideshow, the slideshow is disabled
+# if no interval is set
+SLIDESHOW_INTERVAL = float(os.environ.get("SLIDESHOW_INTERVAL") or 0)
 
 
 CHOSEN_IMAGE_LOG_PATH = LOG_DIR / "chosen_images.log"
@@ -32,18 +39,71 @@ SHOW_FRAME = False
 DEMO_MODE = bool(strtobool(os.environ["DEMO_MODE"]))
 INPUT_VOICE = True
 SATURATION = 0.5
+DITHER = quantization_service.Dither.FLOYD_STEINBERG
 DALLE_DIMENSIONS = image_manipulation_service.Dimensions(width=1024, height=1024)
 # Inky is used in portrait mode, there dimensions are swapped
 INKY_DIMENSIONS = image_manipulation_service.Dimensions(width=448, height=600)
+# A refresh of the 7 colour Inky takes around 30 seconds, the slideshow should
+# not keep the display busy all the time
+SLIDESHOW_MIN_REFRESH_INTERVAL = 120.0
+SLIDESHOW_NUM_PREFETCHED_FRAMES = 3
 
 
-def show_image(image: Image.Image) -> None:
+def show_image(
+    image: Image.Image, dither: quantization_service.Dither = DITHER
+) -> None:
     if RUN_MODE == "pi":
-        inky_service.show_image(image, saturation=SATURATION)
+        inky_service.show_image(image, saturation=SATURATION, dither=dither)
     elif RUN_MODE == "mac":
         image.show()
 
 
+def get_display_image_path(image_path: Path) -> Path:
+    """Return the path of the display image of a generated image."""
+    return image_path.with_name(f"{image_path.stem}_display.png")
+
+
+def render_display_image(
+    image_path: Path,
+    prompt: str,
+    dither: quantization_service.Dither = DITHER,
+    overwrite: bool = False,
+) -> Image.Image:
+    """Return the display image of a generated image, quantized to the Inky
+    palette.
+
+    The display image is saved next to the generated image. Display images
+    that have been saved before, e.g. by `prepare_display_images` on a faster
+    host, are loaded instead of being rendered again.
+    """
+    display_image_path = get_display_image_path(image_path)
+    if display_image_path.is_file() and not overwrite:
+        try:
+            display_image = Image.open(display_image_path)
+            if quantization_service.is_quantized(display_image, SATURATION):
+                return display_image
+        except OSError as error:
+            print(f"Rendering {display_image_path} again: {error!r}")
+
+    display_image = image_manipulation_service.generate_display_image(
+        Image.open(image_path),
+        prompt,
+        INKY_DIMENSIONS,
+        show_frame=SHOW_FRAME,
+    )
+    display_image = quantization_service.quantize_image(
+        display_image, saturation=SATURATION, dither=dither
+    )
+    # The slideshow may read the display image from another thread, so it is
+    # written to a temporary file first
+    temporary_path = display_image_path.with_name(
+        f".{display_image_path.name}.{threading.get_native_id()}"
+    )
+    display_image.save(temporary_path, format="PNG")
+    temporary_path.replace(display_image_path)
+    return display_image
+
+
 def get_choice(message: str) -> int:
     chosen_label = None
     if RUN_MODE == "mac":
@@ -63,7 +123,9 @@ def get_choice(message: str) -> int:
 
 
 def show_collage(
-    image_paths: list[Path], prompts: list[str], play_obj: sa.PlayObject = None
+    image_paths: list[Path],
+    prompts: list[str],
+    play_obj: Optional[audio_service.Voice] = None,
 ) -> None:
     images = [Image.open(image_path) for image_path in image_paths]
 
@@ -74,33 +136,28 @@ def show_collage(
         show_frame=SHOW_FRAME,
     )
     show_image(collage_image)
-    # FIXME: play_obj should not be an argument to this function
-    if play_obj is not None:
-        play_obj.stop()
 
+    beep_obj: Optional[audio_service.Voice] = None
     # if INPUT_VOICE:
     if False:
+        # FIXME: play_obj should not be an argument to this function
+        if play_obj is not None:
+            play_obj.stop()
         # FIXME: Buttons are cool, disable voice choice until voice and buttons can
         # be used simultaniously
         choice = voice_service.get_voice_choice()
     else:
-        audio_service.play_sound("beep", blocking=False)
+        beep_obj = audio_service.play_sound("beep", replace=play_obj)
         choice = get_choice(
             f"Please choose one image to display ({', '.join(BUTTON_LABELS[:-1])} or {BUTTON_LABELS[-1]}): "
         )
 
-    play_obj = audio_service.play_sound("waiting", blocking=False)
-    chosen_image = images[choice]
+    play_obj = audio_service.play_sound("waiting", loop=True, replace=beep_obj)
     prompt = prompts[choice]
     logging_service.append_images_to_log(
         [image_paths[choice]], [prompt], CHOSEN_IMAGE_LOG_PATH
     )
-    display_image = image_manipulation_service.generate_display_image(
-        chosen_image,
-        prompt,
-        INKY_DIMENSIONS,
-        show_frame=SHOW_FRAME,
-    )
+    display_image = render_display_image(image_paths[choice], prompt)
 
     show_image(display_image)
     play_obj.stop()
@@ -113,7 +170,7 @@ def handle_new_prompt() -> None:
         print(f"{prompt = }")
     else:
         prompt = input("Please enter a prompt: ")
-    play_obj = audio_service.play_sound("waiting", blocking=False)
+    play_obj = audio_service.play_sound("waiting", loop=True)
     image_paths = image_generation_service.generate_images_for_prompt(
         prompt, IMAGE_DIR, API_KEY, demo_mode=DEMO_MODE
     )
@@ -124,7 +181,7 @@ def handle_new_prompt() -> None:
 
 
 def handle_last_prompt() -> None:
-    play_obj = audio_service.play_sound("waiting", blocking=False)
+    play_obj = audio_service.play_sound("waiting", loop=True)
     image_paths, prompts = logging_service.get_images_from_log(
         GENERATED_IMAGE_LOG_PATH, IMAGE_DIR, len(BUTTON_LABELS)
     )
@@ -132,7 +189,7 @@ def handle_last_prompt() -> None:
 
 
 def handle_previous_choices() -> None:
-    play_obj = audio_service.play_sound("waiting", blocking=False)
+    play_obj = audio_service.play_sound("waiting", loop=True)
     image_paths, prompts = logging_service.get_images_from_log(
         CHOSEN_IMAGE_LOG_PATH, IMAGE_DIR, len(BUTTON_LABELS)
     )
@@ -149,6 +206,24 @@ def handle_clear() -> None:
 def run_main_loop() -> None:
     if RUN_MODE == "pi":
         inky_service.init_gpio()
+    try:
+        audio_service.init_audio()
+    except (ImportError, OSError) as error:
+        # Sounds are only feedback, the frame works without them
+        print(f"Audio output is not available, sounds are disabled: {error!r}")
+        audio_service.init_audio(audio_service.NullOutputDevice())
+
+    slideshow = slideshow_service.SlideshowScheduler(
+        CHOSEN_IMAGE_LOG_PATH,
+        IMAGE_DIR,
+        render_display_image,
+        show_image,
+        interval=SLIDESHOW_INTERVAL,
+        min_refresh_interval=SLIDESHOW_MIN_REFRESH_INTERVAL,
+        num_prefetched_frames=SLIDESHOW_NUM_PREFETCHED_FRAMES,
+    )
+    if SLIDESHOW_INTERVAL > 0:
+        slideshow.start()
 
     while True:
         choice = get_choice(
@@ -160,14 +235,53 @@ def run_main_loop() -> None:
 {BUTTON_LABELS[3]}: Clear the display.
 """
         )
-        if choice == 0:
-            handle_new_prompt()
-        elif choice == 1:
-            handle_last_prompt()
-        elif choice == 2:
-            handle_previous_choices()
-        elif choice == 3:
-            handle_clear()
+        with slideshow.paused():
+            # A cleared display stays clear until the next user action
+            slideshow.resume()
+            if choice == 0:
+                handle_new_prompt()
+            elif choice == 1:
+                handle_last_prompt()
+            elif choice == 2:
+                handle_previous_choices()
+            elif choice == 3:
+                handle_clear()
+                slideshow.pause()
+
+
+def prepare_display_images() -> None:
+    """Render the display images of all logged images ahead of time.
+
+    This is meant to be run on a faster host than the Pi, the image directory
+    is copied to the Pi afterwards.
+    """
+    parser = argparse.ArgumentParser(description=prepare_display_images.__doc__)
+    parser.add_argument(
+        "--dither",
+        choices=[dither.value for dither in quantization_service.Dither],
+        default=DITHER.value,
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Render display images that have been saved before again.",
+    )
+    args = parser.parse_args()
+
+    rendered_image_paths: set[Path] = set()
+    for log_path in [GENERATED_IMAGE_LOG_PATH, CHOSEN_IMAGE_LOG_PATH]:
+        image_paths, prompts = logging_service.get_images_from_log(log_path, IMAGE_DIR)
+        for image_path, prompt in zip(image_paths, prompts):
+            if image_path in rendered_image_paths or not image_path.is_file():
+                continue
+            render_display_image(
+                image_path,
+                prompt,
+                dither=quantization_service.Dither(args.dither),
+                overwrite=args.overwrite,
+            )
+            rendered_image_paths.add(image_path)
+            print(get_display_image_path(image_path))
 
 
 if __name__ == "__main__":
@@ -4,6 +4,9 @@ from . import (
     image_manipulation_service,
     inky_service,
     logging_service,
+    quantization_service,
+    slideshow_service,
+    text_rendering_service,
     voice_service,
 )
 
@@ -13,5 +16,8 @@ __all__ = [
     "image_manipulation_service",
     "inky_service",
     "logging_service",
+    "quantization_service",
+    "slideshow_service",
+    "text_rendering_service",
     "voice_service",
 ]
@@ -1,19 +1,398 @@
+"""Audio feedback engine.
+
+All sounds in the `sounds` assets are decoded once into 16 bit sample arrays of
+a common format. Playing sounds are mixed into a single output stream, so that
+overlapping sounds don't need separate streams and one sound can replace
+another without a gap. Conversion and mixing are done with numpy, the
+`audioop` module is deprecated and removed in Python 3.13.
+
+PyAudio is imported in functions, so that the engine can be used with the
+`NullOutputDevice` when PyAudio is not installed.
+"""
+import threading
+import time
+import wave
+from collections import deque
 from pathlib import Path
+from typing import Any, Callable, Optional
 
-import simpleaudio as sa
+import numpy as np
+import numpy.typing as npt
 
 from .common import get_absolute_asset_path
 
+SAMPLE_RATE = 44100
+NUM_CHANNELS = 2
+SAMPLE_WIDTH = 2
+FRAME_SIZE = NUM_CHANNELS * SAMPLE_WIDTH
+# Around 12 ms per buffer at 44.1 kHz
+FRAMES_PER_BUFFER = 512
+NUM_RECORDED_LATENCIES = 100
+SAMPLE_MIN = np.iinfo(np.int16).min
+SAMPLE_MAX = np.iinfo(np.int16).max
+
+# Samples of a sound with the shape (frames, channels)
+Samples = npt.NDArray[np.int16]
+# Called with the number of frames to render and the time at which the first
+# frame will be output, returns the rendered PCM data
+RenderCallback = Callable[[int, float], bytes]
+
+
+def _decode_samples(data: bytes, sample_width: int) -> Samples:
+    """Convert little endian PCM data of any sample width to 16 bit samples.
+
+    Like in WAV files, 8 bit samples are unsigned and all other sample widths
+    are signed. Only the most significant bits of wider samples are kept.
+    """
+    if sample_width == 1:
+        unsigned_samples = np.frombuffer(data, dtype=np.uint8).astype(np.int16)
+        return (unsigned_samples - 128) << 8
+    if sample_width == 2:
+        return np.frombuffer(data, dtype="<i2").astype(np.int16)
+    if sample_width == 3:
+        # The two upper bytes of each 24 bit sample form a 16 bit sample
+        upper_bytes = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)[:, 1:]
+        return np.ascontiguousarray(upper_bytes).view("<i2").astype(np.int16)[:, 0]
+    if sample_width == 4:
+        return (np.frombuffer(data, dtype="<i4") >> 16).astype(np.int16)
+    raise ValueError(f"Unsupported sample width {sample_width}.")
+
+
+def _resample(samples: Samples, frame_rate: int) -> Samples:
+    """Resample from the given frame rate to the engine's sample rate with
+    linear interpolation.
+    """
+    num_frames = round(len(samples) * SAMPLE_RATE / frame_rate)
+    positions = np.arange(num_frames) * (frame_rate / SAMPLE_RATE)
+    source_positions = np.arange(len(samples))
+    channels = [
+        np.interp(positions, source_positions, samples[:, channel])
+        for channel in range(samples.shape[1])
+    ]
+    resampled: Samples = np.round(np.stack(channels, axis=1)).astype(np.int16)
+    return resampled
+
+
+def load_sound(wave_path: Path) -> Samples:
+    """Decode a WAV file into samples in the format of the audio engine."""
+    with wave.open(str(wave_path)) as wave_file:
+        num_channels = wave_file.getnchannels()
+        sample_width = wave_file.getsampwidth()
+        frame_rate = wave_file.getframerate()
+        data = wave_file.readframes(wave_file.getnframes())
+
+    if num_channels not in [1, 2]:
+        raise ValueError(
+            f"Unsupported number of channels {num_channels} in {wave_path}."
+        )
+    samples = _decode_samples(data, sample_width).reshape(-1, num_channels)
+    if frame_rate != SAMPLE_RATE:
+        samples = _resample(samples, frame_rate)
+    if num_channels == 1:
+        samples = np.repeat(samples, NUM_CHANNELS, axis=1)
+    return samples
+
+
+def load_sounds(sound_dir: Path) -> dict[str, Samples]:
+    """Decode all WAV files in a directory, keyed by file name without
+    extension.
+    """
+    return {
+        wave_path.stem: load_sound(wave_path)
+        for wave_path in sorted(sound_dir.glob("*.wav"))
+    }
+
+
+class Voice:
+    """A single playback of a sound by the audio engine.
+
+    A voice can be stopped by the caller or waited for until it is done.
+    """
+
+    def __init__(
+        self,
+        engine: "AudioEngine",
+        sound_name: str,
+        samples: Samples,
+        loop: bool,
+        trigger_time: float,
+    ):
+        self.engine = engine
+        self.sound_name = sound_name
+        self.samples = samples
+        self.loop = loop
+        self.trigger_time = trigger_time
+        # Positions in the output stream, counted in frames
+        self.start_frame: Optional[int] = None
+        self.stop_frame: Optional[int] = None
+        # Time from triggering the voice to its first sample leaving the device
+        self.latency: Optional[float] = None
+        # Position in the samples of the sound, counted in frames
+        self._position = 0
+        self._done = threading.Event()
+
+    def stop(self, frame: Optional[int] = None) -> None:
+        """Stop the voice, see `AudioEngine.stop`."""
+        self.engine.stop(self, frame=frame)
+
+    def is_playing(self) -> bool:
+        return not self._done.is_set()
+
+    def wait_done(self) -> None:
+        """Block until the voice has finished playing."""
+        self._done.wait()
+
+    def _read(self, num_frames: int) -> Samples:
+        """Return the next frames of the sound, looping if necessary.
+
+        Fewer frames are returned if the end of a non-looping sound is reached.
+        """
+        chunks = []
+        while num_frames > 0 and len(self.samples) > 0:
+            chunk = self.samples[self._position : self._position + num_frames]
+            chunks.append(chunk)
+            num_frames -= len(chunk)
+            self._position += len(chunk)
+            if self._position >= len(self.samples):
+                if not self.loop:
+                    break
+                self._position = 0
+        if not chunks:
+            return np.empty((0, NUM_CHANNELS), dtype=np.int16)
+        return np.concatenate(chunks)
+
+    def _is_exhausted(self) -> bool:
+        return not self.loop and self._position >= len(self.samples)
+
+
+class OutputDevice:
+    """Base class for audio outputs that pull rendered audio from the engine."""
+
+    def start(self, render: RenderCallback) -> None:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        raise NotImplementedError
+
+
+class PyAudioOutputDevice(OutputDevice):
+    """Output to a sound card using a PyAudio callback stream."""
+
+    def __init__(
+        self,
+        device_index: Optional[int] = None,
+        frames_per_buffer: int = FRAMES_PER_BUFFER,
+    ):
+        self.device_index = device_index
+        self.frames_per_buffer = frames_per_buffer
+        self._pyaudio: Any = None
+        self._stream: Any = None
+
+    def start(self, render: RenderCallback) -> None:
+        import pyaudio
+
+        def callback(
+            in_data: Optional[bytes],
+            frame_count: int,
+            time_info: dict[str, float],
+            status: int,
+        ) -> tuple[bytes, int]:
+            # The DAC time is given relative to the stream clock, only its
+            # distance to the current stream time can be used
+            dac_delay = time_info["output_buffer_dac_time"] - time_info["current_time"]
+            output_time = time.perf_counter() + max(dac_delay, 0.0)
+            return render(frame_count, output_time), pyaudio.paContinue
+
+        self._pyaudio = pyaudio.PyAudio()
+        try:
+            self._stream = self._pyaudio.open(
+                format=self._pyaudio.get_format_from_width(SAMPLE_WIDTH),
+                channels=NUM_CHANNELS,
+                rate=SAMPLE_RATE,
+                output=True,
+                output_device_index=self.device_index,
+                frames_per_buffer=self.frames_per_buffer,
+                stream_callback=callback,
+            )
+        except OSError:
+            # E.g. no output device is available
+            self.stop()
+            raise
+
+    def stop(self) -> None:
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._pyaudio is not None:
+            self._pyaudio.terminate()
+            self._pyaudio = None
+
+
+class NullOutputDevice(OutputDevice):
+    """Output device that discards all audio.
+
+    Audio is only rendered when `process` is called, which allows to drive the
+    engine deterministically, e.g. in tests.
+    """
+
+    def __init__(self) -> None:
+        self._render: Optional[RenderCallback] = None
+
+    def start(self, render: RenderCallback) -> None:
+        self._render = render
+
+    def stop(self) -> None:
+        self._render = None
+
+    def process(self, num_frames: int = FRAMES_PER_BUFFER) -> bytes:
+        """Render and return the next frames of the output stream."""
+        assert self._render is not None, "The device has not been started."
+        return self._render(num_frames, time.perf_counter())
+
+
+class AudioEngine:
+    """Mix preloaded sounds into a single output stream.
+
+    Sounds start and stop on exact frames of the output stream. By default,
+    this is the first frame that has not been rendered yet, so that a sound
+    which replaces another one starts on the same frame the other one stops.
+    """
+
+    def __init__(self, sounds: dict[str, Samples], output_device: OutputDevice):
+        self.sounds = sounds
+        self.output_device = output_device
+        self.latencies: deque[float] = deque(maxlen=NUM_RECORDED_LATENCIES)
+        self._voices: list[Voice] = []
+        # Position of the next frame to be rendered
+        self._frame = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        self.output_device.start(self.render)
+
+    def stop_output(self) -> None:
+        self.output_device.stop()
+
+    def get_frame(self) -> int:
+        """Return the position of the next frame to be rendered."""
+        with self._lock:
+            return self._frame
+
+    def play(
+        self,
+        sound_name: str,
+        loop: bool = False,
+        frame: Optional[int] = None,
+        replace: Optional[Voice] = None,
+    ) -> Voice:
+        """Start playing a sound at the given frame of the output stream.
+
+        If `replace` is given, that voice is stopped at the frame where the
+        new sound starts.
+        """
+        if sound_name not in self.sounds:
+            raise ValueError(f"Unknown sound {sound_name}.")
+        voice = Voice(
+            self,
+            sound_name,
+            self.sounds[sound_name],
+            loop=loop,
+            trigger_time=time.perf_counter(),
+        )
+        with self._lock:
+            voice.start_frame = max(self._frame, frame or 0)
+            if replace is not None:
+                self._stop(replace, voice.start_frame)
+            self._voices.append(voice)
+        return voice
+
+    def stop(self, voice: Voice, frame: Optional[int] = None) -> None:
+        """Stop playing a voice at the given frame of the output stream."""
+        with self._lock:
+            self._stop(voice, max(self._frame, frame or 0))
+
+    def _stop(self, voice: Voice, frame: int) -> None:
+        if voice.stop_frame is None or frame < voice.stop_frame:
+            voice.stop_frame = frame
+        # A voice that stops before the next rendered frame is done right away,
+        # without waiting for the output device
+        if voice.stop_frame <= self._frame and voice in self._voices:
+            self._voices.remove(voice)
+            voice._done.set()
+
+    def render(self, num_frames: int, output_time: float) -> bytes:
+        """Mix the next frames of all playing voices.
+
+        `output_time` is the time at which the first rendered frame will leave
+        the output device, it is used to measure the latency of voices.
+        """
+        with self._lock:
+            block_start = self._frame
+            block_end = block_start + num_frames
+            self._frame = block_end
+            # Voices are summed with headroom and clipped to 16 bit afterwards
+            mix = np.zeros((num_frames, NUM_CHANNELS), dtype=np.int32)
+            for voice in list(self._voices):
+                assert voice.start_frame is not None
+                start = max(voice.start_frame, block_start)
+                end = block_end
+                if voice.stop_frame is not None:
+                    end = min(voice.stop_frame, block_end)
+                if start < end:
+                    if voice.latency is None:
+                        first_sample_time = (
+                            output_time + (start - block_start) / SAMPLE_RATE
+                        )
+                        voice.latency = first_sample_time - voice.trigger_time
+                        self.latencies.append(voice.latency)
+                    samples = voice._read(end - start)
+                    offset = start - block_start
+                    mix[offset : offset + len(samples)] += samples
+                is_stopped = voice.stop_frame is not None and voice.stop_frame <= end
+                if is_stopped or voice._is_exhausted():
+                    self._voices.remove(voice)
+                    voice._done.set()
+        return np.clip(mix, SAMPLE_MIN, SAMPLE_MAX).astype(np.int16).tobytes()
+
+
+_ENGINE: Optional[AudioEngine] = None
+
+
+def init_audio(output_device: Optional[OutputDevice] = None) -> AudioEngine:
+    """Preload all sounds and start the audio output.
+
+    This method should be called once before sounds are played, otherwise the
+    sounds are loaded when the first sound is played. If the output cannot be
+    started, the error is raised and no engine is set.
+    """
+    global _ENGINE
+    if _ENGINE is not None:
+        _ENGINE.stop_output()
+        _ENGINE = None
+    sounds = load_sounds(get_absolute_asset_path(Path("sounds")))
+    engine = AudioEngine(sounds, output_device or PyAudioOutputDevice())
+    engine.start()
+    _ENGINE = engine
+    return _ENGINE
+
 
-def play_sound(sound_name: str, blocking: bool = False) -> sa.PlayObject:
+def play_sound(
+    sound_name: str,
+    blocking: bool = False,
+    loop: bool = False,
+    replace: Optional[Voice] = None,
+) -> Voice:
     """Play a sound file in the `sounds` assets given the file name without
     extensions.
 
-    The PlayObject is returned so that the sound can be stopped by the caller.
+    The Voice is returned so that the sound can be stopped by the caller. If
+    `replace` is given, that voice is stopped on the exact frame where the new
+    sound starts.
     """
-    wave_path = get_absolute_asset_path(Path(f"sounds/{sound_name}.wav"))
-    wave_obj = sa.WaveObject.from_wave_file(str(wave_path))
-    play_obj = wave_obj.play()
+    assert not (blocking and loop), "A looping sound cannot be played blocking."
+    engine = _ENGINE if _ENGINE is not None else init_audio()
+    voice = engine.play(sound_name, loop=loop, replace=replace)
     if blocking:
-        play_obj.wait_done()
-    return play_obj
+        voice.wait_done()
+    return voice
@@ -1,10 +1,12 @@
 import textwrap
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Optional
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 
+from . import text_rendering_service
 from .common import get_absolute_asset_path
 
 SOLID_BLACK = (0, 0, 0)
@@ -31,14 +33,6 @@ class Dimensions:
         return str(self.as_tuple())
 
 
-def _get_font(
-    font_size: int, font_name: str = "Silent Reaction.ttf"
-) -> ImageFont.ImageFont:
-    """Return the base font for image labels."""
-    font_path = get_absolute_asset_path(Path("fonts") / font_name)
-    return ImageFont.truetype(str(font_path), size=font_size)
-
-
 def _split_long_text(text: str, max_line_length: int) -> str:
     """Split long text by adding newline characters for lines exceeding the
     maximum desired line length.
@@ -46,17 +40,17 @@ def _split_long_text(text: str, max_line_length: int) -> str:
     return "\n".join(textwrap.wrap(text, width=max_line_length))
 
 
-def _overlay_label_image(
-    input_image: Image.Image,
-    label_padding: int = 20,  # FIXME: hardcoded for the specific image file
-    label_image_name: str = "label.png",
+@lru_cache(maxsize=None)
+def _get_label_image(
+    width: int, label_padding: int, label_image_name: str
 ) -> Image.Image:
-    """Overlay the label image on top of the input image.
+    """Return the padded label image scaled to the given width.
 
-    The label image is used a a backdrop for image text descriptions.
+    The result is cached because labels are rendered with the same few widths
+    over and over again. It must not be modified by the caller.
     """
     label_image = Image.open(get_absolute_asset_path(Path("images") / label_image_name))
-    label_scale = input_image.width / label_image.width
+    label_scale = width / label_image.width
     label_image = label_image.resize(
         (
             round(label_image.width * label_scale),
@@ -64,7 +58,19 @@ def _overlay_label_image(
         )
     )
     label_padding = round(label_padding * label_scale)
-    label_image = pad_image(label_image, label_padding)
+    return pad_image(label_image, label_padding)
+
+
+def _overlay_label_image(
+    input_image: Image.Image,
+    label_padding: int = 20,  # FIXME: hardcoded for the specific image file
+    label_image_name: str = "label.png",
+) -> Image.Image:
+    """Overlay the label image on top of the input image.
+
+    The label image is used a a backdrop for image text descriptions.
+    """
+    label_image = _get_label_image(input_image.width, label_padding, label_image_name)
     output_image = input_image.copy()
     output_image.paste(label_image, (0, 0), label_image)
     return output_image
@@ -78,12 +84,16 @@ def generate_text_box(
     text_color: tuple[int, int, int] = SOLID_BLACK,
     text_shift: tuple[int, int] = (0, 0),
     text_padding: tuple[int, int] = (10, 10),
+    use_glyph_atlas: bool = True,
 ) -> Image.Image:
     """Create a box containing text.
 
     The text is fit automatically into the bounding box by iteratively checking
     whether a combination of line breaks and decreased font size will make the
     text boundary box contained inside the image boundary box.
+
+    Unless `use_glyph_atlas` is disabled, simple texts are composited from
+    cached glyphs instead of being laid out by PIL.
     """
     text_box_image = Image.new("RGB", output_dimensions.as_tuple(), background_color)
     text_box_image = _overlay_label_image(text_box_image)
@@ -96,13 +106,15 @@ def generate_text_box(
     image_boundary_box = text_box_image.getbbox()
     original_font_size = font_size
     max_line_length = len(text)
-    draw = ImageDraw.Draw(text_box_image)
 
     while True:
-        font = _get_font(font_size=font_size)
         wrapped_text = _split_long_text(text, max_line_length)
-        text_bounding_box = draw.textbbox(
-            xy, wrapped_text, anchor="mm", align="center", font=font
+        text_bounding_box = text_rendering_service.get_text_bbox(
+            text_box_image,
+            xy,
+            wrapped_text,
+            font_size,
+            use_glyph_atlas=use_glyph_atlas,
         )
         if (
             text_bounding_box[0] < image_boundary_box[0] + text_padding[0]
@@ -120,13 +132,13 @@ def generate_text_box(
         else:
             break
 
-    draw.text(
+    text_rendering_service.draw_text(
+        text_box_image,
         xy,
         wrapped_text,
-        anchor="mm",
-        align="center",
-        fill=text_color,
-        font=_get_font(font_size=font_size),
+        font_size,
+        text_color,
+        use_glyph_atlas=use_glyph_atlas,
     )
     return text_box_image
 
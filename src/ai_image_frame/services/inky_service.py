@@ -5,26 +5,37 @@ from typing import Optional
 
 from PIL import Image
 
+from . import quantization_service
+
 # Gpio pins for each button (from left to right, reverse alphabetical order, in
 # portrait mode)
 BUTTON_PINS = [24, 16, 6, 5]
 
 
 def show_image(
-    image: Image, should_rotate: bool = True, saturation: float = 0.5
+    image: Image,
+    should_rotate: bool = True,
+    saturation: float = 0.5,
+    dither: quantization_service.Dither = quantization_service.Dither.FLOYD_STEINBERG,
 ) -> None:
     """Show a given image on the Inky.
 
     By default, the image is rotated by 90 degrees, because the inky is used in
     portrait mode but its original orientation is landscape.
+
+    The image is quantized to the Inky palette with the given dithering, unless
+    it has already been quantized with `quantization_service`.
     """
     from inky import Inky7Colour as Inky
 
     inky = Inky()
     inky.set_border(Inky.BLACK)
+    if not quantization_service.is_quantized(image, saturation):
+        image = quantization_service.quantize_image(image, saturation, dither)
     if should_rotate:
         image = image.rotate(90, expand=True)
-    inky.set_image(image, saturation=saturation)
+    # The inky library does not convert images that are in `P` mode already
+    inky.set_image(image)
     inky.show()
 
 
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
 
 def remove_duplicates(input_list: list[Any]) -> list[Any]:
@@ -18,10 +18,12 @@ def append_images_to_log(
 
 
 def get_images_from_log(
-    log_path: Path, image_dir: Path, num_entries: int
+    log_path: Path, image_dir: Path, num_entries: Optional[int] = None
 ) -> tuple[list[Path], list[str]]:
     """Return a number of recent unique images in the given log as path/prompt pairs.
 
+    If `num_entries` is not given, all unique images in the log are returned.
+
     The log is opened with `a+` mode so that the log file is created if it
     doens't exist.
     """
@@ -33,11 +35,11 @@ def get_images_from_log(
     image_paths: list[Path] = []
     prompts: list[str] = []
     for line in reversed(lines):
-        image_path_string, prompt = line.split(",")
+        image_path_string, prompt = line.split(",", maxsplit=1)
         image_path = image_dir / Path(image_path_string)
         if image_path not in image_paths:
             image_paths.insert(0, image_path)
             prompts.insert(0, prompt)
-        if len(image_paths) >= num_entries:
+        if num_entries is not None and len(image_paths) >= num_entries:
             break
     return image_paths, prompts
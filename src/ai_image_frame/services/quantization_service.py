@@ -0,0 +1,243 @@
+"""Colour quantization for the 7 colour Inky.
+
+Instead of letting the inky library quantize every frame on the Pi, images are
+mapped to the panel palette with a precomputed lookup table. Floyd-Steinberg
+dithering uses PIL's native implementation instead, which is faster than error
+diffusion with numpy. Quantized images are `P` mode images with the panel
+palette, which the inky library shows without converting them again.
+"""
+from enum import Enum
+from functools import lru_cache
+
+import numpy as np
+import numpy.typing as npt
+from PIL import Image
+
+# Panel colours as used by the inky library, in the order of the palette
+# indices of the display. The clean colour is not used for quantization.
+DESATURATED_PALETTE = [
+    (0, 0, 0),
+    (255, 255, 255),
+    (0, 255, 0),
+    (0, 0, 255),
+    (255, 0, 0),
+    (255, 255, 0),
+    (255, 140, 0),
+]
+SATURATED_PALETTE = [
+    (57, 48, 57),
+    (255, 255, 255),
+    (58, 91, 70),
+    (61, 59, 94),
+    (156, 72, 75),
+    (208, 190, 71),
+    (177, 106, 73),
+]
+# Number of bits per channel that are used to index the lookup table
+LUT_BITS = 6
+# 8x8 Bayer matrix for ordered dithering
+BAYER_MATRIX = np.array(
+    [
+        [0, 32, 8, 40, 2, 34, 10, 42],
+        [48, 16, 56, 24, 50, 18, 58, 26],
+        [12, 44, 4, 36, 14, 46, 6, 38],
+        [60, 28, 52, 20, 62, 30, 54, 22],
+        [3, 35, 11, 43, 1, 33, 9, 41],
+        [51, 19, 59, 27, 49, 17, 57, 25],
+        [15, 47, 7, 39, 13, 45, 5, 37],
+        [63, 31, 55, 23, 61, 29, 53, 21],
+    ]
+)
+ORDERED_DITHER_SPREAD = 64.0
+# Error diffusion kernels as (x offset, y offset, weight), errors may only be
+# passed to later pixels of the same row or to rows below
+FLOYD_STEINBERG_KERNEL = [
+    (1, 0, 7 / 16),
+    (-1, 1, 3 / 16),
+    (0, 1, 5 / 16),
+    (1, 1, 1 / 16),
+]
+ATKINSON_KERNEL = [
+    (1, 0, 1 / 8),
+    (2, 0, 1 / 8),
+    (-1, 1, 1 / 8),
+    (0, 1, 1 / 8),
+    (1, 1, 1 / 8),
+    (0, 2, 1 / 8),
+]
+
+# Palette indices of an image with the shape (height, width)
+PaletteIndices = npt.NDArray[np.uint8]
+
+
+class Dither(Enum):
+    """Dithering algorithms available for quantization."""
+
+    NONE = "none"
+    ORDERED = "ordered"
+    FLOYD_STEINBERG = "floyd-steinberg"
+    ATKINSON = "atkinson"
+
+
+@lru_cache(maxsize=None)
+def get_palette(saturation: float = 0.5) -> tuple[tuple[int, int, int], ...]:
+    """Return the panel palette blended for the given saturation.
+
+    The colours are computed the same way as in the inky library.
+    """
+    return tuple(
+        (
+            int(saturated[0] * saturation + desaturated[0] * (1.0 - saturation)),
+            int(saturated[1] * saturation + desaturated[1] * (1.0 - saturation)),
+            int(saturated[2] * saturation + desaturated[2] * (1.0 - saturation)),
+        )
+        for saturated, desaturated in zip(SATURATED_PALETTE, DESATURATED_PALETTE)
+    )
+
+
+def _get_flat_palette(saturation: float) -> list[int]:
+    return [value for colour in get_palette(saturation) for value in colour]
+
+
+@lru_cache(maxsize=None)
+def get_palette_lut(saturation: float = 0.5) -> PaletteIndices:
+    """Return a 3D lookup table from RGB colours to the nearest palette index.
+
+    The table is indexed with the `LUT_BITS` most significant bits of each
+    channel, colours are compared at the centers of the table cells.
+    """
+    num_levels = 2**LUT_BITS
+    cell_size = 256 // num_levels
+    # Cell centers lie halfway between integers, their squared distances to
+    # the palette colours are exact in float32
+    levels = np.arange(num_levels, dtype=np.float32) * cell_size + (cell_size - 1) / 2
+    red, green, blue = np.meshgrid(levels, levels, levels, indexing="ij", sparse=True)
+    # Keep a running minimum over the palette colours instead of computing all
+    # distances at once, so that building the table only needs a few MB
+    shape = (num_levels, num_levels, num_levels)
+    min_distances = np.full(shape, np.inf, dtype=np.float32)
+    indices: PaletteIndices = np.zeros(shape, dtype=np.uint8)
+    for index, (colour_red, colour_green, colour_blue) in enumerate(
+        get_palette(saturation)
+    ):
+        distances = (
+            (red - colour_red) ** 2
+            + (green - colour_green) ** 2
+            + (blue - colour_blue) ** 2
+        )
+        is_closer = distances < min_distances
+        min_distances[is_closer] = distances[is_closer]
+        indices[is_closer] = index
+    return indices
+
+
+def _lookup(rgb: npt.NDArray[np.uint8], saturation: float) -> PaletteIndices:
+    """Map an array of RGB values to palette indices."""
+    # Indexing the flattened table with a single array is a lot faster than
+    # indexing the 3D table with one array per channel
+    channels = rgb.astype(np.uint32) >> (8 - LUT_BITS)
+    lut_indices = (
+        channels[..., 0] << (2 * LUT_BITS) | channels[..., 1] << LUT_BITS
+    ) | channels[..., 2]
+    indices: PaletteIndices = get_palette_lut(saturation).take(lut_indices)
+    return indices
+
+
+def _quantize_ordered(rgb: npt.NDArray[np.uint8], saturation: float) -> PaletteIndices:
+    height, width, _ = rgb.shape
+    num_tiles = (height // 8 + 1, width // 8 + 1)
+    thresholds = np.tile(BAYER_MATRIX, num_tiles)[:height, :width]
+    offsets = ((thresholds + 0.5) / BAYER_MATRIX.size - 0.5) * ORDERED_DITHER_SPREAD
+    dithered = rgb + offsets[..., np.newaxis]
+    return _lookup(np.clip(dithered, 0, 255).astype(np.uint8), saturation)
+
+
+def _quantize_error_diffusion(
+    rgb: npt.NDArray[np.uint8],
+    saturation: float,
+    kernel: list[tuple[int, int, float]],
+) -> PaletteIndices:
+    """Quantize with error diffusion.
+
+    A pixel only receives errors from pixels before it in the same row and from
+    rows above. All pixels on a line `x + slope * y = t` are therefore
+    independent of each other and are quantized together, once all lines
+    before them are done. The result is the same as quantizing pixel by pixel.
+    """
+    height, width, _ = rgb.shape
+    # Smallest slope for which all pixels receiving an error lie on later lines
+    slopes = [
+        -x_offset // y_offset + 1 for x_offset, y_offset, _ in kernel if y_offset > 0
+    ]
+    slope = max([1] + slopes)
+    # Offsets of the receiving pixels in a buffer where the image is sheared,
+    # so that the pixels of each line form a column
+    offsets = [
+        (y_offset, x_offset + slope * y_offset, weight)
+        for x_offset, y_offset, weight in kernel
+    ]
+    num_lines = width + slope * (height - 1)
+    max_y_offset = max(y_offset for y_offset, _, _ in offsets)
+    max_line_offset = max(line_offset for _, line_offset, _ in offsets)
+    pixels = np.zeros(
+        (height + max_y_offset, num_lines + max_line_offset, 3), dtype=np.float64
+    )
+    for y in range(height):
+        pixels[y, slope * y : slope * y + width] = rgb[y]
+
+    palette = np.array(get_palette(saturation), dtype=np.float64)
+    sheared_indices = np.zeros((height, num_lines), dtype=np.uint8)
+    for line in range(num_lines):
+        first_y = max(0, -((width - 1 - line) // slope))
+        last_y = min(height - 1, line // slope)
+        line_pixels = pixels[first_y : last_y + 1, line]
+        line_indices = _lookup(
+            np.clip(line_pixels, 0, 255).astype(np.uint8), saturation
+        )
+        sheared_indices[first_y : last_y + 1, line] = line_indices
+        errors = line_pixels - palette[line_indices]
+        for y_offset, line_offset, weight in offsets:
+            pixels[first_y + y_offset : last_y + 1 + y_offset, line + line_offset] += (
+                errors * weight
+            )
+    return np.stack(
+        [sheared_indices[y, slope * y : slope * y + width] for y in range(height)]
+    )
+
+
+def quantize_image(
+    image: Image.Image, saturation: float = 0.5, dither: Dither = Dither.FLOYD_STEINBERG
+) -> Image.Image:
+    """Return the image quantized to the panel palette as a `P` mode image."""
+    image = image.convert("RGB")
+    if dither == Dither.FLOYD_STEINBERG:
+        # PIL's native Floyd-Steinberg dithering is an order of magnitude
+        # faster than error diffusion with numpy, which matters on the Pi
+        palette_image = Image.new("P", (1, 1))
+        palette_image.putpalette(_get_flat_palette(saturation))
+        return image.quantize(palette=palette_image, dither=Image.Dither.FLOYDSTEINBERG)
+
+    rgb = np.asarray(image)
+    if dither == Dither.NONE:
+        indices = _lookup(rgb, saturation)
+    elif dither == Dither.ORDERED:
+        indices = _quantize_ordered(rgb, saturation)
+    elif dither == Dither.ATKINSON:
+        indices = _quantize_error_diffusion(rgb, saturation, ATKINSON_KERNEL)
+    else:
+        raise ValueError(f"Unsupported dither {dither}.")
+    quantized_image = Image.fromarray(indices, mode="P")
+    quantized_image.putpalette(_get_flat_palette(saturation))
+    return quantized_image
+
+
+def is_quantized(image: Image.Image, saturation: float = 0.5) -> bool:
+    """Return whether the image has already been quantized to the panel
+    palette.
+    """
+    if image.mode != "P":
+        return False
+    flat_palette = _get_flat_palette(saturation)
+    _, max_index = image.getextrema()
+    palette = image.getpalette()[: len(flat_palette)]
+    return bool(palette == flat_palette and max_index < len(get_palette(saturation)))
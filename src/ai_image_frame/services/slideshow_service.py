@@ -0,0 +1,221 @@
+"""Idle slideshow that cycles through previously chosen images.
+
+Frames are rendered ahead of time by a low priority worker thread so that a
+display refresh can start as soon as the slideshow timer fires.
+"""
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from PIL import Image
+
+from . import logging_service
+
+WORKER_NICENESS = 19
+EMPTY_LOG_RETRY_INTERVAL = 60.0
+
+
+def _lower_thread_priority(niceness: int = WORKER_NICENESS) -> None:
+    """Lower the scheduling priority of the calling thread.
+
+    On Linux the niceness is a per-thread attribute, so the main thread that
+    polls the buttons keeps its priority. On other platforms this is a no-op.
+    """
+    if sys.platform.startswith("linux"):
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), niceness)
+
+
+class SlideshowScheduler:
+    """Show the images of the chosen image log one after another while the
+    frame is idle.
+
+    `render_frame` turns an image path and its prompt into a display-ready
+    image and is called ahead of time for the next `num_prefetched_frames`
+    images of the rotation. `show_frame` is called from the timer thread once
+    the slideshow interval has passed. Refreshes never happen more often than
+    `min_refresh_interval` allows, because the e-ink panel is slow to refresh.
+    """
+
+    def __init__(
+        self,
+        log_path: Path,
+        image_dir: Path,
+        render_frame: Callable[[Path, str], Image.Image],
+        show_frame: Callable[[Image.Image], None],
+        interval: float,
+        min_refresh_interval: float = 0.0,
+        num_prefetched_frames: int = 2,
+    ):
+        assert num_prefetched_frames >= 1, "At least one frame must be prefetched."
+        self.log_path = log_path
+        self.image_dir = image_dir
+        self.render_frame = render_frame
+        self.show_frame = show_frame
+        self.interval = interval
+        self.min_refresh_interval = min_refresh_interval
+        self.num_prefetched_frames = num_prefetched_frames
+
+        self._frames: deque[Image.Image] = deque()
+        self._rotation_index = 0
+        # Images that could not be rendered are left out of the rotation
+        self._failed_image_paths: set[Path] = set()
+        self._last_refresh_time = time.monotonic()
+        self._is_paused = False
+        # Set by `pause`, unlike `_is_paused` it outlasts user interactions
+        self._is_suspended = False
+        self._is_stopped = False
+        # Guards all attributes above and wakes up the worker and timer threads
+        self._condition = threading.Condition()
+        # Held for the duration of a display refresh or a user interaction
+        self._display_lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        """Start the prefetch worker and the slideshow timer."""
+        for target in [self._run_prefetch_worker, self._run_timer]:
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Stop the slideshow and wait for its threads to finish."""
+        with self._condition:
+            self._is_stopped = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """Suspend the slideshow while the user interacts with the frame.
+
+        Entering the context waits for a running slideshow refresh to finish.
+        The slideshow interval starts over once the context is left.
+        """
+        with self._display_lock:
+            with self._condition:
+                self._is_paused = True
+            try:
+                yield
+            finally:
+                with self._condition:
+                    self._is_paused = False
+                    self._last_refresh_time = time.monotonic()
+                    self._condition.notify_all()
+
+    def pause(self) -> None:
+        """Suspend the slideshow until `resume` is called.
+
+        This keeps the slideshow from showing images e.g. after the user has
+        cleared the display.
+        """
+        with self._condition:
+            self._is_suspended = True
+
+    def resume(self) -> None:
+        """Resume the slideshow after `pause`, the slideshow interval starts
+        over.
+        """
+        with self._condition:
+            if self._is_suspended:
+                self._is_suspended = False
+                self._last_refresh_time = time.monotonic()
+                self._condition.notify_all()
+
+    def _get_seconds_until_refresh(self) -> float:
+        """Return the time left until the next slideshow refresh is due."""
+        interval = max(self.interval, self.min_refresh_interval)
+        return self._last_refresh_time + interval - time.monotonic()
+
+    def _get_next_entry(self) -> Optional[tuple[Path, str]]:
+        """Return the next image/prompt pair of the rotation.
+
+        The log is read again for every entry so that newly chosen images join
+        the rotation without restarting the slideshow. Images that no longer
+        exist or could not be rendered before are skipped.
+        """
+        image_paths, prompts = logging_service.get_images_from_log(
+            self.log_path, self.image_dir
+        )
+        for _ in range(len(image_paths)):
+            index = self._rotation_index % len(image_paths)
+            self._rotation_index = index + 1
+            image_path = image_paths[index]
+            if image_path.is_file() and image_path not in self._failed_image_paths:
+                return image_path, prompts[index]
+        return None
+
+    def _run_prefetch_worker(self) -> None:
+        _lower_thread_priority()
+        while True:
+            with self._condition:
+                while (
+                    not self._is_stopped
+                    and len(self._frames) >= self.num_prefetched_frames
+                ):
+                    self._condition.wait()
+                if self._is_stopped:
+                    return
+            try:
+                entry = self._get_next_entry()
+            except Exception as error:
+                print(f"Slideshow could not read {self.log_path}: {error!r}")
+                entry = None
+            if entry is None:
+                with self._condition:
+                    self._condition.wait(EMPTY_LOG_RETRY_INTERVAL)
+                continue
+            try:
+                frame = self.render_frame(*entry)
+            except Exception as error:
+                # E.g. a truncated image file, keep the worker alive and
+                # continue with the next image of the rotation
+                print(f"Slideshow skips {entry[0]}: {error!r}")
+                self._failed_image_paths.add(entry[0])
+                continue
+            with self._condition:
+                self._frames.append(frame)
+                self._condition.notify_all()
+
+    def _run_timer(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if self._is_stopped:
+                        return
+                    seconds_until_refresh = self._get_seconds_until_refresh()
+                    is_paused = self._is_paused or self._is_suspended
+                    if is_paused or seconds_until_refresh > 0:
+                        self._condition.wait(
+                            None if is_paused else seconds_until_refresh
+                        )
+                    elif not self._frames:
+                        self._condition.wait()
+                    else:
+                        break
+                frame = self._frames.popleft()
+                scheduled_refresh_time = self._last_refresh_time
+                self._condition.notify_all()
+
+            with self._display_lock:
+                with self._condition:
+                    # The user may have taken over the display while the lock
+                    # was being acquired, keep the frame for the next refresh
+                    if self._last_refresh_time != scheduled_refresh_time:
+                        self._frames.appendleft(frame)
+                        continue
+                try:
+                    self.show_frame(frame)
+                except Exception as error:
+                    # E.g. a display timeout, keep the timer alive and retry
+                    # with the next frame after the interval
+                    print(f"Slideshow could not show a frame: {error!r}")
+                finally:
+                    with self._condition:
+                        self._last_refresh_time = time.monotonic()
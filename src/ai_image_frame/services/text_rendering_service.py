@@ -0,0 +1,237 @@
+"""Text rendering for image labels.
+
+Label texts are short and drawn over and over again with the same font sizes,
+e.g. the collage labels "1" to "4". Instead of running the FreeType layout for
+every text, glyphs are rasterised once per font size into a glyph atlas and
+texts are composited from the cached glyph masks. Texts the atlas cannot
+handle are rendered with PIL.
+"""
+import math
+import string
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+from PIL import Image, ImageDraw, ImageFont
+
+from .common import get_absolute_asset_path
+
+DEFAULT_FONT_NAME = "Silent Reaction.ttf"
+# Same as the default spacing of `ImageDraw.multiline_text`
+LINE_SPACING = 4
+# Characters that are laid out by simply placing glyphs next to each other.
+# Everything else might need shaping and is rendered by PIL.
+SIMPLE_TEXT_CHARACTERS = frozenset(
+    string.ascii_letters + string.digits + string.punctuation + " \n"
+)
+
+# Glyph mask and its offset
+Glyph = tuple[npt.NDArray[np.uint8], tuple[int, int]]
+BoundingBox = tuple[int, int, int, int]
+TextBoundingBox = tuple[float, float, float, float]
+
+
+@lru_cache(maxsize=None)
+def get_font(
+    font_size: int, font_name: str = DEFAULT_FONT_NAME
+) -> ImageFont.FreeTypeFont:
+    """Return the base font for image labels."""
+    font_path = get_absolute_asset_path(Path("fonts") / font_name)
+    return ImageFont.truetype(str(font_path), size=font_size)
+
+
+class GlyphAtlas:
+    """Rasterised glyphs of a single font and font size.
+
+    Glyphs are rasterised when a character is used for the first time. Text is
+    always centered on the given position, the same as drawing it with PIL
+    using `anchor="mm"` and `align="center"`.
+    """
+
+    def __init__(self, font: ImageFont.FreeTypeFont):
+        self.font = font
+        # Vertical offset between the middle anchor and the baseline, it only
+        # depends on the font metrics
+        self.baseline_shift = (
+            font.getbbox("A", anchor="lm")[1] - font.getbbox("A", anchor="ls")[1]
+        )
+        self.line_spacing = font.getbbox("A")[3] + LINE_SPACING
+        self._glyphs: dict[str, Glyph] = {}
+        self._advances: dict[str, float] = {}
+
+    def get_glyph(self, char: str) -> Glyph:
+        """Return the glyph mask of a character and its offset to the baseline
+        origin.
+        """
+        if char not in self._glyphs:
+            left, top, right, bottom = self.font.getbbox(char, anchor="ls")
+            mask = Image.new("L", (max(right - left, 0), max(bottom - top, 0)))
+            ImageDraw.Draw(mask).text(
+                (-left, -top), char, fill=255, font=self.font, anchor="ls"
+            )
+            self._glyphs[char] = (np.asarray(mask), (left, top))
+        return self._glyphs[char]
+
+    def _get_advance(self, chars: str) -> float:
+        """Return the advance width of one or two characters.
+
+        The advance of a character pair includes the kerning between them.
+        """
+        if chars not in self._advances:
+            self._advances[chars] = self.font.getlength(chars)
+        return self._advances[chars]
+
+    def _layout_line(self, line: str) -> tuple[list[Glyph], BoundingBox]:
+        """Return the glyphs of a line and its bounding box, both relative to
+        the center of the line.
+
+        Positions are rounded the same way as in PIL's FreeType layout.
+        """
+        glyphs: list[Glyph] = []
+        pen_x = 0.0
+        previous_char = None
+        for char in line:
+            if previous_char is not None:
+                pen_x += self._get_advance(previous_char + char) - self._get_advance(
+                    char
+                )
+            mask, (x_offset, y_offset) = self.get_glyph(char)
+            # Whitespace has no ink, it only moves the pen
+            if mask.size > 0:
+                glyphs.append((mask, (math.floor(pen_x + 0.5) + x_offset, y_offset)))
+            previous_char = char
+        if previous_char is not None:
+            pen_x += self._get_advance(previous_char)
+
+        x_shift = -math.floor(pen_x / 2 + 0.5)
+        glyphs = [
+            (mask, (x + x_shift, y + self.baseline_shift)) for mask, (x, y) in glyphs
+        ]
+        # Like in PIL, the horizontal extent includes the advance of the line
+        # while the vertical extent only includes the glyphs
+        boxes = [
+            (x, y, x + mask.shape[1], y + mask.shape[0]) for mask, (x, y) in glyphs
+        ]
+        bbox = (
+            min([x_shift] + [box[0] for box in boxes]),
+            min([box[1] for box in boxes], default=0),
+            max([x_shift + math.ceil(pen_x)] + [box[2] for box in boxes]),
+            max([box[3] for box in boxes], default=0),
+        )
+        return glyphs, bbox
+
+    def _layout(
+        self, xy: tuple[float, float], text: str
+    ) -> list[tuple[tuple[float, float], list[Glyph], BoundingBox]]:
+        """Return the center position, the glyphs and the bounding box of each
+        line of the text.
+        """
+        lines = text.split("\n")
+        top = xy[1] - (len(lines) - 1) * self.line_spacing / 2
+        return [
+            ((xy[0], top + index * self.line_spacing), *self._layout_line(line))
+            for index, line in enumerate(lines)
+        ]
+
+    def get_text_bbox(self, xy: tuple[float, float], text: str) -> TextBoundingBox:
+        """Return the bounding box of the text centered on `xy`."""
+        boxes = [
+            (x + bbox[0], y + bbox[1], x + bbox[2], y + bbox[3])
+            for (x, y), _, bbox in self._layout(xy, text)
+        ]
+        return (
+            min(box[0] for box in boxes),
+            min(box[1] for box in boxes),
+            max(box[2] for box in boxes),
+            max(box[3] for box in boxes),
+        )
+
+    def draw_text(
+        self,
+        image: Image.Image,
+        xy: tuple[float, float],
+        text: str,
+        fill: tuple[int, int, int],
+    ) -> None:
+        """Draw the text centered on `xy` onto the image."""
+        for (x, y), line_glyphs, (line_left, line_top, _, _) in self._layout(xy, text):
+            if not line_glyphs:
+                continue
+            # PIL truncates the position of each line when drawing
+            line_x = int(x + line_left) - line_left
+            line_y = int(y + line_top) - line_top
+            # Like in PIL, each line is drawn separately, so overlapping lines
+            # are blended instead of merged
+            image.paste(fill, *_composite_glyphs(line_glyphs, (line_x, line_y)))
+
+
+def _composite_glyphs(
+    glyphs: list[Glyph], xy: tuple[int, int]
+) -> tuple[BoundingBox, Image.Image]:
+    """Return the box and the mask of the glyphs placed at `xy`."""
+    left = xy[0] + min(x for _, (x, _) in glyphs)
+    top = xy[1] + min(y for _, (_, y) in glyphs)
+    right = xy[0] + max(x + mask.shape[1] for mask, (x, _) in glyphs)
+    bottom = xy[1] + max(y + mask.shape[0] for mask, (_, y) in glyphs)
+    # Overlapping glyphs are merged the same way FreeType renders them
+    text_mask = np.zeros((bottom - top, right - left), dtype=np.uint8)
+    for mask, (x, y) in glyphs:
+        mask_x = xy[0] + x - left
+        mask_y = xy[1] + y - top
+        region = text_mask[
+            mask_y : mask_y + mask.shape[0], mask_x : mask_x + mask.shape[1]
+        ]
+        np.maximum(region, mask, out=region)
+    return (left, top, right, bottom), Image.fromarray(text_mask)
+
+
+@lru_cache(maxsize=None)
+def get_glyph_atlas(font_size: int, font_name: str = DEFAULT_FONT_NAME) -> GlyphAtlas:
+    """Return the glyph atlas for the given font size."""
+    return GlyphAtlas(get_font(font_size, font_name=font_name))
+
+
+def is_simple_text(text: str) -> bool:
+    """Return whether the text can be rendered with a glyph atlas."""
+    return bool(text.strip()) and all(char in SIMPLE_TEXT_CHARACTERS for char in text)
+
+
+def get_text_bbox(
+    image: Image.Image,
+    xy: tuple[float, float],
+    text: str,
+    font_size: int,
+    use_glyph_atlas: bool = True,
+) -> TextBoundingBox:
+    """Return the bounding box of the text centered on `xy`."""
+    if use_glyph_atlas and is_simple_text(text):
+        return get_glyph_atlas(font_size).get_text_bbox(xy, text)
+    draw = ImageDraw.Draw(image)
+    left, top, right, bottom = draw.textbbox(
+        xy, text, anchor="mm", align="center", font=get_font(font_size)
+    )
+    return (left, top, right, bottom)
+
+
+def draw_text(
+    image: Image.Image,
+    xy: tuple[float, float],
+    text: str,
+    font_size: int,
+    fill: tuple[int, int, int],
+    use_glyph_atlas: bool = True,
+) -> None:
+    """Draw the text centered on `xy` onto the image."""
+    if use_glyph_atlas and is_simple_text(text):
+        get_glyph_atlas(font_size).draw_text(image, xy, text, fill)
+        return
+    draw = ImageDraw.Draw(image)
+    draw.text(
+        xy,
+        text,
+        anchor="mm",
+        align="center",
+        fill=fill,
+        font=get_font(font_size),
+    )
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from types import TracebackType
 from typing import Optional
 
@@ -8,21 +9,29 @@ from pvrecorder import PvRecorder
 
 from . import audio_service
 
-ACCESS_KEY = os.environ["PICOVOICE_ACCESS_KEY"]
 INTENT_NAMES = ["chooseFirst", "chooseSecond", "chooseThird", "chooseFourth"]
-RHINO_CONTEXT_FILE = os.environ["RHINO_CONTEXT_FILE"]
 ENDPOINT_DURATION_SEC = 1.0
 
-_RHINO = pvrhino.create(
-    access_key=ACCESS_KEY,
-    context_path=RHINO_CONTEXT_FILE,
-    endpoint_duration_sec=ENDPOINT_DURATION_SEC,
-)
 
-_CHEETAH = pvcheetah.create(
-    access_key=ACCESS_KEY,
-    endpoint_duration_sec=ENDPOINT_DURATION_SEC,
-)
+@lru_cache(maxsize=None)
+def _get_rhino() -> pvrhino.Rhino:
+    """Return the Rhino engine, it is created on first use so that the services
+    can be imported without Picovoice credentials.
+    """
+    return pvrhino.create(
+        access_key=os.environ["PICOVOICE_ACCESS_KEY"],
+        context_path=os.environ["RHINO_CONTEXT_FILE"],
+        endpoint_duration_sec=ENDPOINT_DURATION_SEC,
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_cheetah() -> pvcheetah.Cheetah:
+    """Return the Cheetah engine, it is created on first use."""
+    return pvcheetah.create(
+        access_key=os.environ["PICOVOICE_ACCESS_KEY"],
+        endpoint_duration_sec=ENDPOINT_DURATION_SEC,
+    )
 
 
 class AudioRecorder:
@@ -48,13 +57,14 @@ class AudioRecorder:
 
 def get_voice_choice() -> int:
     """Get a choice of four different values."""
-    with AudioRecorder(_RHINO.frame_length) as recorder:
+    rhino = _get_rhino()
+    with AudioRecorder(rhino.frame_length) as recorder:
         audio_service.play_sound("beep")
         print("Rhino ready")
         while True:
-            is_finalized = _RHINO.process(recorder.read())
+            is_finalized = rhino.process(recorder.read())
             if is_finalized:
-                inference = _RHINO.get_inference()
+                inference = rhino.get_inference()
                 if inference.is_understood:
                     intent_name = inference.intent
                     break
@@ -64,13 +74,14 @@ def get_voice_choice() -> int:
 def get_voice_input() -> str:
     """Get transcribed voice input."""
     final_transcript = ""
-    with AudioRecorder(_CHEETAH.frame_length) as recorder:
+    cheetah = _get_cheetah()
+    with AudioRecorder(cheetah.frame_length) as recorder:
         audio_service.play_sound("beep")
         print("Cheetah ready")
         while True:
-            partial_transcript, is_endpoint = _CHEETAH.process(recorder.read())
+            partial_transcript, is_endpoint = cheetah.process(recorder.read())
             final_transcript += partial_transcript
             if is_endpoint:
-                final_transcript += _CHEETAH.flush()
+                final_transcript += cheetah.flush()
                 break
     return final_transcript
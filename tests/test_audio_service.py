@@ -0,0 +1,111 @@
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ai_image_frame.services import audio_service
+from ai_image_frame.services.audio_service import AudioEngine, NullOutputDevice
+
+
+def make_sound(*values: int) -> audio_service.Samples:
+    """Return a stereo sound with the given sample values on both channels."""
+    return np.repeat(np.array(values, dtype=np.int16)[:, np.newaxis], 2, axis=1)
+
+
+def process(device: NullOutputDevice, num_frames: int) -> list[int]:
+    """Render the next frames and return the samples of the left channel."""
+    samples = np.frombuffer(device.process(num_frames), dtype=np.int16)
+    return samples.reshape(-1, 2)[:, 0].tolist()
+
+
+@pytest.fixture
+def device() -> NullOutputDevice:
+    return NullOutputDevice()
+
+
+@pytest.fixture
+def engine(device: NullOutputDevice) -> AudioEngine:
+    engine = AudioEngine(
+        {
+            "ramp": make_sound(1, 2, 3),
+            "low": make_sound(10, 10, 10, 10),
+            "high": make_sound(100, 100),
+            "loud": make_sound(30000, -30000),
+        },
+        device,
+    )
+    engine.start()
+    return engine
+
+
+def test_voices_are_mixed(engine: AudioEngine, device: NullOutputDevice) -> None:
+    engine.play("low")
+    engine.play("high", frame=1)
+    assert process(device, 6) == [10, 110, 110, 10, 0, 0]
+
+
+def test_mix_is_clipped(engine: AudioEngine, device: NullOutputDevice) -> None:
+    engine.play("loud")
+    engine.play("loud")
+    assert process(device, 2) == [32767, -32768]
+
+
+def test_replace_switches_on_the_same_frame(
+    engine: AudioEngine, device: NullOutputDevice
+) -> None:
+    ramp = engine.play("ramp", loop=True)
+    assert process(device, 2) == [1, 2]
+    high = engine.play("high", replace=ramp)
+    assert high.start_frame == ramp.stop_frame == 2
+    # No gap and no overlap between the two sounds
+    assert process(device, 4) == [100, 100, 0, 0]
+    assert not ramp.is_playing()
+    assert not high.is_playing()
+
+
+def test_looping_sound_wraps_around(
+    engine: AudioEngine, device: NullOutputDevice
+) -> None:
+    engine.play("ramp", loop=True)
+    assert process(device, 4) == [1, 2, 3, 1]
+    assert process(device, 4) == [2, 3, 1, 2]
+
+
+def test_voice_stops_at_given_frame(
+    engine: AudioEngine, device: NullOutputDevice
+) -> None:
+    voice = engine.play("ramp", loop=True)
+    voice.stop(frame=5)
+    assert process(device, 4) == [1, 2, 3, 1]
+    assert voice.is_playing()
+    assert process(device, 4) == [2, 0, 0, 0]
+    assert not voice.is_playing()
+
+
+def test_latency_is_recorded(engine: AudioEngine, device: NullOutputDevice) -> None:
+    voice = engine.play("low", frame=441)
+    time_before_output = time.perf_counter()
+    process(device, 512)
+    assert voice.latency is not None
+    # The first sample leaves the device 441 frames after the start of the
+    # rendered block
+    assert voice.latency >= time_before_output - voice.trigger_time + 0.01
+    assert list(engine.latencies) == [voice.latency]
+
+
+def test_sounds_are_converted_to_engine_format(tmp_path: Path) -> None:
+    wave_path = tmp_path / "sound.wav"
+    with wave.open(str(wave_path), "wb") as wave_file:
+        wave_file.setnchannels(1)
+        wave_file.setsampwidth(1)
+        wave_file.setframerate(audio_service.SAMPLE_RATE // 2)
+        wave_file.writeframes(bytes([128, 255, 0, 128]))
+
+    samples = audio_service.load_sound(wave_path)
+    assert samples.dtype == np.int16
+    assert samples.shape == (8, 2)
+    # 8 bit samples are unsigned and resampling interpolates linearly
+    assert samples[:, 0].tolist() == [0, 16256, 32512, -128, -32768, -16384, 0, 0]
+    assert np.array_equal(samples[:, 0], samples[:, 1])
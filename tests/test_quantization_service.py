@@ -0,0 +1,95 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from ai_image_frame.services import quantization_service
+from ai_image_frame.services.quantization_service import Dither
+
+SATURATIONS = [0.0, 0.5, 1.0]
+KERNELS = [
+    quantization_service.FLOYD_STEINBERG_KERNEL,
+    quantization_service.ATKINSON_KERNEL,
+]
+
+
+def make_rgb(height: int, width: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).integers(
+        0, 256, (height, width, 3), dtype=np.uint8
+    )
+
+
+def quantize_pixel_by_pixel(
+    rgb: np.ndarray, saturation: float, kernel: list[tuple[int, int, float]]
+) -> np.ndarray:
+    """Reference error diffusion that quantizes one pixel after the other."""
+    height, width, _ = rgb.shape
+    palette = np.array(quantization_service.get_palette(saturation), dtype=np.float64)
+    lut = quantization_service.get_palette_lut(saturation)
+    shift = 8 - quantization_service.LUT_BITS
+    pixels = rgb.astype(np.float64)
+    indices = np.zeros((height, width), dtype=np.uint8)
+    for y in range(height):
+        for x in range(width):
+            red, green, blue = np.clip(pixels[y, x], 0, 255).astype(np.uint8) >> shift
+            indices[y, x] = lut[red, green, blue]
+            error = pixels[y, x] - palette[indices[y, x]]
+            for x_offset, y_offset, weight in kernel:
+                if 0 <= x + x_offset < width and y + y_offset < height:
+                    pixels[y + y_offset, x + x_offset] += error * weight
+    return indices
+
+
+@pytest.mark.parametrize("saturation", SATURATIONS)
+def test_palette_lut_contains_nearest_colours_of_cell_centers(
+    saturation: float,
+) -> None:
+    num_levels = 2**quantization_service.LUT_BITS
+    cell_size = 256 // num_levels
+    levels = np.arange(num_levels) * cell_size + (cell_size - 1) / 2
+    centers = np.stack(np.meshgrid(levels, levels, levels, indexing="ij"), axis=-1)
+    palette = np.array(quantization_service.get_palette(saturation))
+    distances = ((centers[..., np.newaxis, :] - palette) ** 2).sum(axis=-1)
+    assert np.array_equal(
+        quantization_service.get_palette_lut(saturation), distances.argmin(axis=-1)
+    )
+
+
+@pytest.mark.parametrize("kernel", KERNELS)
+@pytest.mark.parametrize("shape", [(1, 9), (9, 1), (5, 7), (1, 1)])
+def test_error_diffusion_matches_pixel_by_pixel_quantization(
+    kernel: list[tuple[int, int, float]], shape: tuple[int, int]
+) -> None:
+    for seed in range(5):
+        rgb = make_rgb(*shape, seed=seed)
+        indices = quantization_service._quantize_error_diffusion(rgb, 0.5, kernel)
+        assert np.array_equal(indices, quantize_pixel_by_pixel(rgb, 0.5, kernel))
+
+
+@pytest.mark.parametrize("dither", list(Dither))
+def test_quantized_images_use_panel_palette(dither: Dither) -> None:
+    image = Image.fromarray(make_rgb(6, 11))
+    quantized_image = quantization_service.quantize_image(image, 0.5, dither)
+    assert quantized_image.mode == "P"
+    assert quantized_image.size == (11, 6)
+    flat_palette = [
+        value for colour in quantization_service.get_palette(0.5) for value in colour
+    ]
+    assert quantized_image.getpalette()[: len(flat_palette)] == flat_palette
+    assert quantized_image.getextrema()[1] < len(quantization_service.get_palette())
+
+
+def test_quantized_image_is_recognized_after_saving(tmp_path: Path) -> None:
+    image = Image.fromarray(make_rgb(8, 8))
+    quantized_image = quantization_service.quantize_image(image, 0.5, Dither.ORDERED)
+    quantized_image.save(tmp_path / "display.png")
+    loaded_image = Image.open(tmp_path / "display.png")
+    assert quantization_service.is_quantized(loaded_image, 0.5)
+    assert not quantization_service.is_quantized(loaded_image, 1.0)
+
+
+def test_other_palette_images_are_not_recognized() -> None:
+    image = Image.fromarray(make_rgb(8, 8))
+    assert not quantization_service.is_quantized(image)
+    assert not quantization_service.is_quantized(image.quantize(256))
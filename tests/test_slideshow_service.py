@@ -0,0 +1,168 @@
+import queue
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pytest
+from PIL import Image
+
+from ai_image_frame.services import logging_service
+from ai_image_frame.services.slideshow_service import SlideshowScheduler
+
+TIMEOUT = 5.0
+IMAGE_NAMES = ["a.png", "b.png", "c.png"]
+
+# Times and paths of the shown frames
+Shows = queue.Queue[tuple[float, Path]]
+
+
+def render_frame(image_path: Path, prompt: str) -> Image.Image:
+    frame = Image.open(image_path)
+    frame.load()
+    frame.info["path"] = image_path
+    return frame
+
+
+@pytest.fixture
+def image_dir(tmp_path: Path) -> Path:
+    image_dir = tmp_path / "images"
+    image_dir.mkdir()
+    for image_name in IMAGE_NAMES:
+        Image.new("RGB", (4, 4)).save(image_dir / image_name)
+    return image_dir
+
+
+@pytest.fixture
+def log_path(tmp_path: Path, image_dir: Path) -> Path:
+    log_path = tmp_path / "chosen_images.log"
+    image_paths = [image_dir / image_name for image_name in IMAGE_NAMES]
+    logging_service.append_images_to_log(
+        image_paths, ["prompt"] * len(image_paths), log_path
+    )
+    return log_path
+
+
+@contextmanager
+def run_slideshow(
+    log_path: Path,
+    image_dir: Path,
+    interval: float,
+    min_refresh_interval: float = 0.0,
+    render_frame: Callable[[Path, str], Image.Image] = render_frame,
+) -> Iterator[tuple[SlideshowScheduler, Shows]]:
+    shows: Shows = queue.Queue()
+    slideshow = SlideshowScheduler(
+        log_path,
+        image_dir,
+        render_frame,
+        lambda frame: shows.put((time.monotonic(), frame.info["path"])),
+        interval=interval,
+        min_refresh_interval=min_refresh_interval,
+    )
+    slideshow.start()
+    try:
+        yield slideshow, shows
+    finally:
+        slideshow.stop()
+
+
+def get_shows(shows: Shows, num_shows: int) -> list[tuple[float, Path]]:
+    return [shows.get(timeout=TIMEOUT) for _ in range(num_shows)]
+
+
+def test_images_are_shown_in_log_order(log_path: Path, image_dir: Path) -> None:
+    start_time = time.monotonic()
+    with run_slideshow(log_path, image_dir, interval=0.05) as (_, shows):
+        show_times, image_paths = zip(*get_shows(shows, 4))
+    assert [image_path.name for image_path in image_paths] == [
+        "a.png",
+        "b.png",
+        "c.png",
+        "a.png",
+    ]
+    gaps = [later - earlier for earlier, later in zip(show_times, show_times[1:])]
+    assert show_times[0] - start_time >= 0.05
+    assert min(gaps) >= 0.05
+
+
+def test_refreshes_are_limited_by_min_refresh_interval(
+    log_path: Path, image_dir: Path
+) -> None:
+    with run_slideshow(
+        log_path, image_dir, interval=0.01, min_refresh_interval=0.2
+    ) as (_, shows):
+        show_times, _ = zip(*get_shows(shows, 3))
+    gaps = [later - earlier for earlier, later in zip(show_times, show_times[1:])]
+    assert min(gaps) >= 0.2
+
+
+def test_paused_postpones_refresh(log_path: Path, image_dir: Path) -> None:
+    with run_slideshow(log_path, image_dir, interval=0.1) as (slideshow, shows):
+        with slideshow.paused():
+            time.sleep(0.3)
+            assert shows.empty()
+            resume_time = time.monotonic()
+        show_time, _ = shows.get(timeout=TIMEOUT)
+    assert show_time - resume_time >= 0.1
+
+
+def test_pause_lasts_until_resume(log_path: Path, image_dir: Path) -> None:
+    with run_slideshow(log_path, image_dir, interval=0.05) as (slideshow, shows):
+        with slideshow.paused():
+            slideshow.pause()
+        time.sleep(0.3)
+        assert shows.empty()
+        slideshow.resume()
+        get_shows(shows, 1)
+
+
+def test_missing_images_are_skipped(log_path: Path, image_dir: Path) -> None:
+    (image_dir / "b.png").unlink()
+    with run_slideshow(log_path, image_dir, interval=0.01) as (_, shows):
+        _, image_paths = zip(*get_shows(shows, 3))
+    assert [image_path.name for image_path in image_paths] == [
+        "a.png",
+        "c.png",
+        "a.png",
+    ]
+
+
+def test_images_that_fail_to_render_are_skipped(
+    log_path: Path, image_dir: Path
+) -> None:
+    # A truncated image can be opened but fails to load
+    image_bytes = (image_dir / "b.png").read_bytes()
+    (image_dir / "b.png").write_bytes(image_bytes[: len(image_bytes) // 2])
+    with run_slideshow(log_path, image_dir, interval=0.01) as (_, shows):
+        _, image_paths = zip(*get_shows(shows, 3))
+    assert [image_path.name for image_path in image_paths] == [
+        "a.png",
+        "c.png",
+        "a.png",
+    ]
+
+
+def test_frames_that_fail_to_show_are_retried_after_interval(
+    log_path: Path, image_dir: Path
+) -> None:
+    shows: Shows = queue.Queue()
+    failure_times: list[float] = []
+
+    def show_frame(frame: Image.Image) -> None:
+        if not failure_times:
+            # E.g. the display timing out while waiting for busy
+            failure_times.append(time.monotonic())
+            raise RuntimeError("Timed out waiting for busy")
+        shows.put((time.monotonic(), frame.info["path"]))
+
+    slideshow = SlideshowScheduler(
+        log_path, image_dir, render_frame, show_frame, interval=0.05
+    )
+    slideshow.start()
+    try:
+        show_times, image_paths = zip(*get_shows(shows, 2))
+    finally:
+        slideshow.stop()
+    assert [image_path.name for image_path in image_paths] == ["b.png", "c.png"]
+    assert show_times[0] - failure_times[0] >= 0.05
@@ -0,0 +1,36 @@
+import pytest
+from PIL import Image, ImageChops
+
+from ai_image_frame.services import text_rendering_service
+
+TEXTS = [
+    "1",
+    "Hello, World!",
+    "AV To Wa",
+    "a lighthouse\non a cliff",
+    # Descenders of the first line overlap the second line
+    "gjpqy\nTHE",
+    "x  y\n\nz",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+@pytest.mark.parametrize("font_size", [12, 32, 45])
+@pytest.mark.parametrize("xy", [(100, 60), (100.5, 60.5), (113.25, 71.75)])
+def test_glyph_atlas_matches_pil(
+    text: str, font_size: int, xy: tuple[float, float]
+) -> None:
+    atlas_image = Image.new("RGB", (224, 140), (10, 20, 30))
+    pil_image = atlas_image.copy()
+    text_rendering_service.draw_text(
+        atlas_image, xy, text, font_size, (250, 200, 100), use_glyph_atlas=True
+    )
+    text_rendering_service.draw_text(
+        pil_image, xy, text, font_size, (250, 200, 100), use_glyph_atlas=False
+    )
+    assert ImageChops.difference(atlas_image, pil_image).getbbox() is None
+    assert text_rendering_service.get_text_bbox(
+        atlas_image, xy, text, font_size, use_glyph_atlas=True
+    ) == text_rendering_service.get_text_bbox(
+        pil_image, xy, text, font_size, use_glyph_atlas=False
+    )